@@ -124,6 +124,9 @@ USE_TZ = True
 
 STATIC_URL = "static/"
 
+# Uploaded files (spooled here while an upload is processed)
+MEDIA_ROOT = BASE_DIR / "media"
+
 LOGIN_URL = "login"
 LOGIN_REDIRECT_URL = "trade_dashboard"
 LOGOUT_REDIRECT_URL = "login"
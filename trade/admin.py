@@ -26,5 +26,6 @@ class TradeDataAdmin(admin.ModelAdmin):
 
     list_filter = ("year", "month", "trade_type")
     search_fields = ("hs_code__code", "country")
+    # Keep the join: search filters on hs_code__code
     list_select_related = ("hs_code",)
     list_per_page = 50
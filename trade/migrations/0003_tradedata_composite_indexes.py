@@ -0,0 +1,39 @@
+# Generated by Django 5.2.18 on 2026-10-14 17:51
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('trade', '0002_tradedata_trade_trade_country_9b06da_idx'),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='tradedata',
+            name='trade_trade_trade_t_7d6c32_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='tradedata',
+            name='trade_trade_country_9b06da_idx',
+        ),
+        migrations.AlterField(
+            model_name='tradedata',
+            name='country',
+            field=models.CharField(max_length=100),
+        ),
+        migrations.AlterField(
+            model_name='tradedata',
+            name='trade_type',
+            field=models.CharField(choices=[('IMPORT', 'Import'), ('EXPORT', 'Export')], max_length=6),
+        ),
+        migrations.AddIndex(
+            model_name='tradedata',
+            index=models.Index(fields=['country', 'trade_type', 'year'], name='td_ctry_tt_yr_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='tradedata',
+            index=models.Index(fields=['trade_type', 'year', 'month'], name='td_tt_ym_idx'),
+        ),
+    ]
@@ -0,0 +1,42 @@
+# Generated by Django 5.2.18 on 2026-10-14 17:52
+
+import django.db.models.functions.text
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('trade', '0003_tradedata_composite_indexes'),
+    ]
+
+    # Generated columns can't be altered in place, so drop and re-add them.
+    operations = [
+        migrations.RemoveField(
+            model_name='hscode',
+            name='chapter',
+        ),
+        migrations.AddField(
+            model_name='hscode',
+            name='chapter',
+            field=models.GeneratedField(db_index=True, db_persist=True, expression=django.db.models.functions.text.Substr('code', 1, 2), output_field=models.CharField(max_length=2)),
+        ),
+        migrations.RemoveField(
+            model_name='hscode',
+            name='heading',
+        ),
+        migrations.AddField(
+            model_name='hscode',
+            name='heading',
+            field=models.GeneratedField(db_index=True, db_persist=True, expression=django.db.models.functions.text.Substr('code', 1, 4), output_field=models.CharField(max_length=4)),
+        ),
+        migrations.RemoveField(
+            model_name='hscode',
+            name='subheading',
+        ),
+        migrations.AddField(
+            model_name='hscode',
+            name='subheading',
+            field=models.GeneratedField(db_index=True, db_persist=True, expression=django.db.models.functions.text.Substr('code', 1, 6), output_field=models.CharField(max_length=6)),
+        ),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 5.2.18 on 2026-10-14 17:53
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('trade', '0004_hscode_generated_prefixes'),
+    ]
+
+    operations = [
+        migrations.AddConstraint(
+            model_name='tradedata',
+            constraint=models.CheckConstraint(condition=models.Q(('trade_type__in', ['IMPORT', 'EXPORT'])), name='td_trade_type_upper'),
+        ),
+    ]
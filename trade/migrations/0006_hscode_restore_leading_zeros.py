@@ -0,0 +1,36 @@
+from django.db import migrations
+
+
+def restore_leading_zeros(apps, schema_editor):
+    """Pad numeric HS codes that lost their leading zero (801310000).
+
+    Uploads used to parse hs_code as a number. If the padded code already
+    exists (from a later upload), move its trades over and drop the
+    stripped duplicate.
+    """
+    HSCode = apps.get_model("trade", "HSCode")
+    TradeData = apps.get_model("trade", "TradeData")
+
+    for hs in list(HSCode.objects.filter(code__regex=r"^[0-9]+$").only("id", "code")):
+        if len(hs.code) % 2 == 0:
+            continue
+
+        padded = "0" + hs.code
+        existing = HSCode.objects.filter(code=padded).first()
+
+        if existing:
+            TradeData.objects.filter(hs_code_id=hs.pk).update(hs_code_id=existing.pk)
+            HSCode.objects.filter(pk=hs.pk).delete()
+        else:
+            HSCode.objects.filter(pk=hs.pk).update(code=padded)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("trade", "0005_tradedata_trade_type_check"),
+    ]
+
+    operations = [
+        migrations.RunPython(restore_leading_zeros, migrations.RunPython.noop),
+    ]
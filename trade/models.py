@@ -1,4 +1,5 @@
 from django.db import models
+from django.db.models.functions import Substr
 
 # Create your models here.
 # from django.db import models
@@ -8,20 +9,30 @@ class HSCode(models.Model):
     code = models.CharField(max_length=10, unique=True)
     description = models.TextField()
 
-    # First 2 digits (chapter)
-    chapter = models.CharField(max_length=2, db_index=True)
+    # First 2 digits (chapter), derived by the database so bulk inserts
+    # populate it too
+    chapter = models.GeneratedField(
+        expression=Substr("code", 1, 2),
+        output_field=models.CharField(max_length=2),
+        db_persist=True,
+        db_index=True,
+    )
 
     # Optional: 4-digit group
-    heading = models.CharField(max_length=4, db_index=True, blank=True)
+    heading = models.GeneratedField(
+        expression=Substr("code", 1, 4),
+        output_field=models.CharField(max_length=4),
+        db_persist=True,
+        db_index=True,
+    )
 
     # Optional: 6-digit subheading
-    subheading = models.CharField(max_length=6, db_index=True, blank=True)
-
-    def save(self, *args, **kwargs):
-        self.chapter = self.code[:2]
-        self.heading = self.code[:4]
-        self.subheading = self.code[:6]
-        super().save(*args, **kwargs)
+    subheading = models.GeneratedField(
+        expression=Substr("code", 1, 6),
+        output_field=models.CharField(max_length=6),
+        db_persist=True,
+        db_index=True,
+    )
 
     def __str__(self):
         return f"{self.code}"
@@ -29,21 +40,22 @@ class HSCode(models.Model):
 
 # trade data models
 class TradeData(models.Model):
+    IMPORT = "IMPORT"
+    EXPORT = "EXPORT"
+
     TRADE_TYPE_CHOICES = [
-        ("IMPORT", "Import"),
-        ("EXPORT", "Export"),
+        (IMPORT, "Import"),
+        (EXPORT, "Export"),
     ]
 
     year = models.PositiveSmallIntegerField(db_index=True)
     month = models.PositiveSmallIntegerField(db_index=True)
 
-    trade_type = models.CharField(
-        max_length=6, choices=TRADE_TYPE_CHOICES, db_index=True
-    )
+    trade_type = models.CharField(max_length=6, choices=TRADE_TYPE_CHOICES)
 
     hs_code = models.ForeignKey(HSCode, on_delete=models.PROTECT, related_name="trades")
 
-    country = models.CharField(max_length=100, db_index=True)
+    country = models.CharField(max_length=100)
 
     quantity = models.DecimalField(max_digits=18, decimal_places=2)
     unit = models.CharField(max_length=20, blank=True, null=True)
@@ -55,10 +67,20 @@ class TradeData(models.Model):
     class Meta:
         indexes = [
             models.Index(fields=["year", "month"]),
-            models.Index(fields=["trade_type"]),
             models.Index(fields=["hs_code", "year"]),
             models.Index(fields=["hs_code", "trade_type"]),
-            models.Index(fields=["country"]),
+            # Dashboard filters; these also cover country / trade_type lookups
+            models.Index(
+                fields=["country", "trade_type", "year"], name="td_ctry_tt_yr_idx"
+            ),
+            models.Index(fields=["trade_type", "year", "month"], name="td_tt_ym_idx"),
+        ]
+        constraints = [
+            # Uploads normalise trade_type to uppercase; keep it that way
+            models.CheckConstraint(
+                condition=models.Q(trade_type__in=["IMPORT", "EXPORT"]),
+                name="td_trade_type_upper",
+            ),
         ]
         ordering = ["-year", "-month"]
 
@@ -0,0 +1,15 @@
+from django.core.paginator import Paginator
+
+
+class PrecountedPaginator(Paginator):
+    """Paginator that can reuse a row count the caller already computed.
+
+    Passing ``count`` skips the ``SELECT COUNT(*)`` Django would otherwise
+    run against the queryset; without it this behaves like ``Paginator``.
+    """
+
+    def __init__(self, *args, count=None, **kwargs):
+        super().__init__(*args, **kwargs)
+        if count is not None:
+            # Instance attribute shadows the cached_property
+            self.count = count
@@ -1,3 +1,92 @@
+from decimal import Decimal
+from unittest import skipUnless
+
+from django.db import connection
 from django.test import TestCase
+from django.utils import timezone
+
+from .bulk import bulk_insert_models
+from .models import HSCode, TradeData
 
 # Create your tests here.
+
+
+@skipUnless(connection.vendor == "postgresql", "COPY path is PostgreSQL only")
+class BulkInsertModelsTests(TestCase):
+    fields = (
+        "year",
+        "month",
+        "trade_type",
+        "hs_code_id",
+        "country",
+        "quantity",
+        "unit",
+        "value_usd",
+    )
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.hs_code = HSCode.objects.create(code="0801310000", description="Cashew")
+
+    def make_rows(self, country):
+        return [
+            TradeData(
+                year=2024,
+                month=1,
+                trade_type=TradeData.EXPORT,
+                hs_code_id=self.hs_code.pk,
+                country=country,
+                quantity=Decimal("10.257"),
+                unit=None,
+                value_usd=Decimal("1234.5"),
+            ),
+            TradeData(
+                year=2023,
+                month=12,
+                trade_type=TradeData.IMPORT,
+                hs_code_id=self.hs_code.pk,
+                country=country,
+                quantity=0.1,
+                unit=None,
+                value_usd=7,
+            ),
+        ]
+
+    def test_matches_bulk_create(self):
+        TradeData.objects.bulk_create(self.make_rows("bulk_create"))
+        bulk_insert_models(self.make_rows("copy"))
+
+        expected = list(
+            TradeData.objects.filter(country="bulk_create")
+            .order_by("-year")
+            .values_list(*self.fields)
+        )
+        copied = list(
+            TradeData.objects.filter(country="copy")
+            .order_by("-year")
+            .values_list(*self.fields)
+        )
+
+        self.assertEqual(len(copied), 2)
+        self.assertEqual(
+            [row[:4] + row[5:] for row in copied],
+            [row[:4] + row[5:] for row in expected],
+        )
+        self.assertEqual(copied[0][5], Decimal("10.26"))
+        self.assertEqual(copied[1][5], Decimal("0.10"))
+        self.assertIsNone(copied[0][6])
+        self.assertEqual(copied[0][3], self.hs_code.pk)
+
+    def test_sets_created_at(self):
+        started = timezone.now()
+        bulk_insert_models(self.make_rows("copy"))
+
+        self.assertEqual(
+            TradeData.objects.filter(country="copy", created_at__gte=started).count(),
+            2,
+        )
+
+    def test_empty_list_is_noop(self):
+        bulk_insert_models([])
+
+        self.assertFalse(TradeData.objects.exists())
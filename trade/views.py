@@ -1,27 +1,146 @@
 from django.views import View
 from django.shortcuts import render, redirect
 from django.contrib import messages
-from django.db import transaction
+from django.db import connection, transaction
 from django.core.files.storage import default_storage
+from django.core.cache import cache
+
+import codecs
+from contextlib import closing
 
 import pandas as pd
-import io
+from charset_normalizer import from_bytes
 
 from .models import TradeData, HSCode
 from .forms import TradeUploadForm
+from .bulk import bulk_insert_models
+from .paginators import PrecountedPaginator
 from django.views.generic import ListView
 from django.db.models import Q
-from django.db.models import Sum, Count
+from django.db.models import Sum, Count, Max
 from django.db.models.functions import TruncMonth
 from django.db.models import F, Value
 from django.db.models.functions import Concat, Cast
 from django.db.models import DateField
 import calendar
+from decimal import Decimal
 import csv
-from django.http import HttpResponse
+from django.http import StreamingHttpResponse
 from django.contrib.auth.mixins import LoginRequiredMixin
 from django.contrib.auth.decorators import login_required
 
+DROPDOWN_CACHE_PREFIX = "trade:dropdowns:v1"
+
+CSV_CHUNK_SIZE = 50_000
+
+# Rows shown in each dashboard top-N panel
+TOP_PANEL_SIZE = 10
+
+# Columns shown in the dashboard table and CSV export
+TRADE_ROW_FIELDS = [
+    "year",
+    "month",
+    "trade_type",
+    "country",
+    "quantity",
+    "value_usd",
+    "hs_code__code",
+    "hs_code__description",
+]
+
+CSV_ENCODINGS = ["utf_8", "cp1252", "latin_1"]
+CSV_ENCODING_SAMPLE_SIZE = 64 * 1024
+
+# Column types for uploaded CSVs; nullable ints so blank cells parse as NA
+CSV_DTYPES = {
+    "year": "Int32",
+    # Int16, not Int8: the C parser wraps out-of-range values (257 -> 1)
+    "month": "Int16",
+    "trade_type": "category",
+    "hs_code": "category",
+    "country": "category",
+    "description": "string",
+    "quantity": "float64",
+    "value_usd": "float64",
+}
+
+
+def normalize_hs_codes(codes):
+    """Return HS codes as stripped strings with any lost leading zero restored.
+
+    Excel cells and older uploads hold codes as numbers, which drops the
+    leading zero of chapters 01-09 (0801310000 -> 801310000). HS codes have
+    an even number of digits, so odd-length numeric codes get it back.
+    """
+    codes = codes.astype(str).str.strip()
+    lost_zero = codes.str.fullmatch(r"\d+") & (codes.str.len() % 2 == 1)
+    return codes.mask(lost_zero, "0" + codes)
+
+
+def map_categories(series, func=None):
+    """Return ``series`` as a categorical with ``func`` applied to its categories.
+
+    The transform runs once per distinct value rather than once per row.
+    Categories that clean up to the same string are merged, and missing
+    values become "".
+    """
+    series = series.astype("category")
+    labels = pd.Series(series.cat.categories.astype(str))
+    if func is not None:
+        labels = func(labels)
+
+    # Trailing "" is picked up by missing values, whose code is -1
+    labels = pd.Index([*labels.tolist(), ""])
+    categories = labels.unique()
+    codes = categories.get_indexer(labels)[series.cat.codes.to_numpy()]
+    return pd.Series(pd.Categorical.from_codes(codes, categories), index=series.index)
+
+
+def decodes_cleanly(path, encoding, block_size=1024 * 1024):
+    """Return True if the whole file decodes strictly with ``encoding``."""
+    decoder = codecs.getincrementaldecoder(encoding)(errors="strict")
+    try:
+        with open(path, "rb") as f:
+            while block := f.read(block_size):
+                decoder.decode(block)
+        decoder.decode(b"", final=True)
+    except UnicodeDecodeError:
+        return False
+    return True
+
+
+def get_dropdown_values():
+    return {
+        "years": list(
+            TradeData.objects.values_list("year", flat=True).distinct().order_by("year")
+        ),
+        "months": list(
+            TradeData.objects.values_list("month", flat=True)
+            .distinct()
+            .order_by("month")
+        ),
+        "trade_types": list(
+            TradeData.objects.values_list("trade_type", flat=True)
+            .distinct()
+            .order_by("trade_type")
+        ),
+        "countries": list(
+            TradeData.objects.values_list("country", flat=True)
+            .distinct()
+            .order_by("country")
+        ),
+    }
+
+
+def get_cached_dropdown_values():
+    # The cache is per process (LocMemCache), so a delete on upload would only
+    # reach one worker. Key on the newest row id instead: uploads only append,
+    # so every worker sees a new key after an upload.
+    latest_id = TradeData.objects.aggregate(latest=Max("id"))["latest"]
+    return cache.get_or_set(
+        f"{DROPDOWN_CACHE_PREFIX}:{latest_id}", get_dropdown_values, 3600
+    )
+
 
 class TradeUploadView(LoginRequiredMixin, View):
     template_name = "trade/upload.html"
@@ -40,16 +159,24 @@ class TradeUploadView(LoginRequiredMixin, View):
         file = request.FILES["file"]
         filename = file.name.lower()
 
+        stored_name = None
+
         try:
             # ✅ Detect file type properly
-            if filename.endswith(".csv"):
-                df = self.read_csv_safely(file)
-            elif filename.endswith(".xlsx"):
-                df = pd.read_excel(file)
-            else:
+            if not filename.endswith((".csv", ".xlsx")):
                 messages.error(request, "Only CSV or Excel files are allowed.")
                 return redirect("trade_upload")
 
+            # Spool the upload to disk so pandas reads from a path rather
+            # than an in-memory copy of the whole file
+            stored_name = default_storage.save(f"uploads/{file.name}", file)
+            path = default_storage.path(stored_name)
+
+            if filename.endswith(".csv"):
+                chunks = self.read_csv_safely(path)
+            else:
+                chunks = self.read_excel_safely(path)
+
             required_columns = {
                 "year",
                 "month",
@@ -61,11 +188,19 @@ class TradeUploadView(LoginRequiredMixin, View):
                 "value_usd",
             }
 
-            if not required_columns.issubset(df.columns):
-                messages.error(request, "Missing required columns in file.")
-                return redirect("trade_upload")
+            # HS code ids resolved so far, shared across chunks
+            hs_id_by_code = {}
+            records_inserted = 0
+
+            # closing() shuts the reader, and its handle on the spooled file,
+            # even when the loop returns early
+            with closing(chunks), transaction.atomic():
+                for df in chunks:
+                    if not required_columns.issubset(df.columns):
+                        messages.error(request, "Missing required columns in file.")
+                        return redirect("trade_upload")
 
-            records_inserted = self.process_dataframe(df)
+                    records_inserted += self.process_dataframe(df, hs_id_by_code)
 
             messages.success(
                 request, f"{records_inserted} records uploaded successfully."
@@ -76,49 +211,98 @@ class TradeUploadView(LoginRequiredMixin, View):
             messages.error(request, f"Upload failed: {str(e)}")
             return redirect("trade_upload")
 
+        finally:
+            if stored_name:
+                default_storage.delete(stored_name)
+
     #  Professional encoding-safe CSV reader
-    def read_csv_safely(self, file):
+    def read_csv_safely(self, path):
 
-        file.seek(0)
-        raw_data = file.read()
+        encoding = self.detect_encoding(path)
 
-        # Try UTF-8 first
-        try:
-            return pd.read_csv(io.BytesIO(raw_data), encoding="utf-8")
-        except UnicodeDecodeError:
-            pass
+        # Read in chunks so memory is bounded by CSV_CHUNK_SIZE, not file size;
+        # the reader closes the file once the chunks are exhausted
+        with pd.read_csv(
+            path,
+            dtype=CSV_DTYPES,
+            encoding=encoding,
+            chunksize=CSV_CHUNK_SIZE,
+        ) as reader:
+            yield from reader
 
-        # Try Windows encoding
-        try:
-            return pd.read_csv(io.BytesIO(raw_data), encoding="latin1")
-        except UnicodeDecodeError:
-            pass
+    def read_excel_safely(self, path):
+
+        # Workbooks are read whole and processed as a single chunk
+        yield pd.read_excel(path, engine="calamine", dtype={"hs_code": str})
+
+    def detect_encoding(self, path):
+
+        with open(path, "rb") as f:
+            sample = f.read(CSV_ENCODING_SAMPLE_SIZE)
 
-        # Final fallback
-        return pd.read_csv(io.BytesIO(raw_data), encoding="cp1252")
+        # Guess from a sample, limited to the encodings uploads are expected
+        # to use. Cut the sample at a line break so it doesn't end
+        # mid-character.
+        sample = sample[: sample.rfind(b"\n") + 1] or sample
+        match = from_bytes(sample, cp_isolation=CSV_ENCODINGS).best()
+        guessed = match.encoding if match else CSV_ENCODINGS[0]
+
+        # The sample can miss bytes further into the file, so confirm the guess
+        # with a strict decode of the whole file before any chunk is inserted,
+        # falling back to the next candidate. latin_1 decodes any byte.
+        candidates = [guessed] + [e for e in CSV_ENCODINGS if e != guessed]
+        for encoding in candidates:
+            if decodes_cleanly(path, encoding):
+                return encoding
+
+        return CSV_ENCODINGS[-1]
 
     # 🔥 High-performance insert logic
-    def process_dataframe(self, df):
+    def process_dataframe(self, df, hs_id_by_code):
+
+        df["description"] = df["description"].fillna("")
+        # Codes, countries and trade types repeat heavily, so they're
+        # categoricals (parsed as such for CSV) cleaned per distinct value
+        df["hs_code"] = map_categories(df["hs_code"], normalize_hs_codes)
+        df["country"] = map_categories(df["country"])
+        df["trade_type"] = map_categories(
+            df["trade_type"], lambda types: types.str.upper().str.strip()
+        )
 
-        df = df.fillna("")
-        df["hs_code"] = df["hs_code"].astype(str).str.strip()
-        df["trade_type"] = df["trade_type"].str.upper().str.strip()
+        # Coerce numeric columns in one pass instead of per row
+        for column in ["year", "month"]:
+            df[column] = pd.to_numeric(df[column], errors="coerce")
+        for column in ["quantity", "value_usd"]:
+            df[column] = (
+                pd.to_numeric(df[column], errors="coerce").fillna(0).astype("float64")
+            )
 
-        # Validate month range
-        df = df[(df["month"] >= 1) & (df["month"] <= 12)]
+        # Validate month range and trade type
+        df = df[
+            df["year"].notna()
+            & (df["month"] >= 1)
+            & (df["month"] <= 12)
+            & df["trade_type"].isin([TradeData.IMPORT, TradeData.EXPORT])
+        ]
+        df = df.astype({"year": "int32", "month": "int8"})
 
-        unique_hs_codes = df[["hs_code", "description"]].drop_duplicates()
+        # One row per code not already resolved by an earlier chunk
+        unique_hs_codes = df[["hs_code", "description"]].drop_duplicates("hs_code")
+        unique_hs_codes = unique_hs_codes[
+            ~unique_hs_codes["hs_code"].isin(hs_id_by_code)
+        ]
 
-        # Preload existing HS codes
-        existing_hs = {
-            hs.code: hs
-            for hs in HSCode.objects.filter(code__in=unique_hs_codes["hs_code"])
-        }
+        # Preload ids of existing HS codes
+        hs_id_by_code.update(
+            HSCode.objects.filter(code__in=unique_hs_codes["hs_code"]).values_list(
+                "code", "id"
+            )
+        )
 
         new_hs_objects = []
 
         for row in unique_hs_codes.itertuples(index=False):
-            if row.hs_code not in existing_hs:
+            if row.hs_code not in hs_id_by_code:
                 new_hs_objects.append(
                     HSCode(
                         code=row.hs_code,
@@ -127,29 +311,42 @@ class TradeUploadView(LoginRequiredMixin, View):
                 )
 
         if new_hs_objects:
+            # bulk_create sets pk on PostgreSQL and SQLite, so no reload query
             HSCode.objects.bulk_create(new_hs_objects, batch_size=1000)
-
-        # Reload all HS codes after insertion
-        all_hs = {hs.code: hs for hs in HSCode.objects.filter(code__in=df["hs_code"])}
-
-        trade_objects = []
-
-        for row in df.itertuples(index=False):
-            trade_objects.append(
-                TradeData(
-                    year=int(row.year),
-                    month=int(row.month),
-                    trade_type=row.trade_type,
-                    hs_code=all_hs[row.hs_code],
-                    country=row.country,
-                    quantity=row.quantity,
-                    unit=None,
-                    value_usd=row.value_usd,
-                )
+            hs_id_by_code.update((hs.code, hs.pk) for hs in new_hs_objects)
+
+        # Pull each column out once as plain Python values (tolist() converts
+        # in C, so no numpy scalar boxing per row) and resolve FK ids with a
+        # vectorised map instead of a dict lookup per row
+        years = df["year"].tolist()
+        months = df["month"].tolist()
+        trade_types = df["trade_type"].tolist()
+        # Drop categories emptied by the row filter; unmapped ones would turn
+        # the ids into floats
+        hs_code_ids = (
+            df["hs_code"].cat.remove_unused_categories().map(hs_id_by_code).tolist()
+        )
+        countries = df["country"].tolist()
+        quantities = df["quantity"].tolist()
+        values = df["value_usd"].tolist()
+
+        trade_objects = [
+            TradeData(
+                year=year,
+                month=month,
+                trade_type=trade_type,
+                hs_code_id=hs_code_id,
+                country=country,
+                quantity=quantity,
+                unit=None,
+                value_usd=value_usd,
             )
+            for year, month, trade_type, hs_code_id, country, quantity, value_usd in zip(
+                years, months, trade_types, hs_code_ids, countries, quantities, values
+            )
+        ]
 
-        with transaction.atomic():
-            TradeData.objects.bulk_create(trade_objects, batch_size=2000)
+        bulk_insert_models(trade_objects)
 
         return len(trade_objects)
 
@@ -163,9 +360,13 @@ class TradeDataListView(LoginRequiredMixin, ListView):
     login_url = "login"
     context_object_name = "trades"
     paginate_by = 50
+    paginator_class = PrecountedPaginator
 
     def get_queryset(self):
-        queryset = TradeData.objects.select_related("hs_code").all()
+        # select_related suits the 50-row page; the aggregates in
+        # get_context_data group via values() so they don't pay for the join.
+        # Avoid a blanket prefetch_related here, it adds a query per page.
+        queryset = TradeData.objects.select_related("hs_code").only(*TRADE_ROW_FIELDS)
 
         year = self.request.GET.get("year")
         month = self.request.GET.get("month")
@@ -192,48 +393,52 @@ class TradeDataListView(LoginRequiredMixin, ListView):
                 # | Q(country__icontains=search)
             )
 
+        # Cache filtered queryset so get_context_data doesn't rebuild it
+        self._filtered_qs = queryset
         return queryset
 
-    def get_context_data(self, **kwargs):
-        context = super().get_context_data(**kwargs)
+    def get_paginator(self, queryset, per_page, **kwargs):
+        # Reuse total_records from the totals aggregate instead of a COUNT(*)
+        return super().get_paginator(
+            queryset, per_page, count=self._totals["total_records"], **kwargs
+        )
 
+    def get_context_data(self, **kwargs):
         # IMPORTANT: Use filtered queryset for totals
-        filtered_queryset = self.get_queryset()
+        filtered_queryset = self._filtered_qs
 
-        totals = filtered_queryset.aggregate(
+        # Computed before pagination so the paginator can reuse the count
+        totals = self._totals = filtered_queryset.aggregate(
             total_quantity=Sum("quantity"),
             total_value=Sum("value_usd"),
             total_records=Count("id"),
         )
 
+        context = super().get_context_data(**kwargs)
+
         context["total_quantity"] = totals["total_quantity"] or 0
         context["total_value"] = totals["total_value"] or 0
         context["total_records"] = totals["total_records"] or 0
 
-        # top 10 countries by value based on filtering
-        top_countries = (
-            filtered_queryset.exclude(country__isnull=True)
-            .exclude(country="")
-            .values("country")
-            .annotate(total_value=Sum("value_usd"))
-            .order_by("-total_value")[:10]
-        )
-        context["top_countries"] = top_countries
+        # top 10 countries, top 10 crops and trade split in one round trip
+        panels = self.get_top_panels(filtered_queryset)
 
-        # top 10 crops
-        top_hs_codes = (
-            filtered_queryset.values("hs_code__code", "hs_code__description")
-            .annotate(total_value=Sum("value_usd"))
-            .order_by("-total_value")[:10]
-        )
+        context["top_countries"] = [
+            {"country": key, "total_value": total}
+            for key, label, total in panels["top_countries"]
+        ]
+
+        top_hs_codes = [
+            {"hs_code__code": key, "hs_code__description": label, "total_value": total}
+            for key, label, total in panels["top_hs_codes"]
+        ]
         context["top_hs_codes"] = top_hs_codes
 
         # trade split
-        trade_split = list(
-            filtered_queryset.values("trade_type").annotate(
-                total_value=Sum("value_usd")
-            )
-        )
+        trade_split = [
+            {"trade_type": key, "total_value": total}
+            for key, label, total in panels["trade_split"]
+        ]
         total_trade = sum(item["total_value"] or 0 for item in trade_split)
         for item in trade_split:
             if total_trade > 0:
@@ -244,59 +449,86 @@ class TradeDataListView(LoginRequiredMixin, ListView):
 
         # cncentration risk
         top_total = sum(item["total_value"] for item in top_hs_codes)
-        overall_total = (
-            filtered_queryset.aggregate(total=Sum("value_usd"))["total"] or 0
-        )
+        overall_total = context["total_value"]
         concentration_ratio = (
             (top_total / overall_total) * 100 if overall_total > 0 else 0
         )
         context["concentration_ratio"] = round(concentration_ratio, 2)
 
-        # trade balance
-        exports = (
-            filtered_queryset.filter(trade_type="Export").aggregate(
-                total=Sum("value_usd")
-            )["total"]
-            or 0
-        )
-        imports = (
-            filtered_queryset.filter(trade_type="Import").aggregate(
-                total=Sum("value_usd")
-            )["total"]
-            or 0
-        )
+        # trade balance (derived from trade_split, stored uppercase on upload)
+        by_type = {row["trade_type"]: row["total_value"] or 0 for row in trade_split}
+        exports = by_type.get(TradeData.EXPORT, 0)
+        imports = by_type.get(TradeData.IMPORT, 0)
         context["trade_balance"] = exports - imports
 
-        # Distinct filter dropdown values
-        context["years"] = (
-            TradeData.objects.values_list("year", flat=True).distinct().order_by("year")
-        )
+        # Distinct filter dropdown values (cached per upload)
+        context.update(get_cached_dropdown_values())
 
-        context["months"] = (
-            TradeData.objects.values_list("month", flat=True)
-            .distinct()
-            .order_by("month")
-        )
+        return context
 
-        context["trade_types"] = (
-            TradeData.objects.values_list("trade_type", flat=True)
-            .distinct()
-            .order_by("trade_type")
-        )
+    def get_top_panels(self, queryset):
+        """Run the dashboard's grouped aggregates as a single UNION ALL query.
+
+        Each panel is compiled by the ORM and wrapped in a subquery, which
+        keeps its ORDER BY/LIMIT working on SQLite as well as PostgreSQL.
+        Returns ``{panel: [(key, label, total_value), ...]}``.
+        """
+        total = Sum("value_usd")
+        panels = {
+            "top_countries": (
+                queryset.exclude(country__isnull=True)
+                .exclude(country="")
+                .values(group_key=F("country"), group_label=Value(""))
+                .annotate(total_value=total)
+                .order_by("-total_value")[:TOP_PANEL_SIZE]
+            ),
+            "top_hs_codes": (
+                queryset.values(
+                    group_key=F("hs_code__code"),
+                    group_label=F("hs_code__description"),
+                )
+                .annotate(total_value=total)
+                .order_by("-total_value")[:TOP_PANEL_SIZE]
+            ),
+            "trade_split": queryset.values(
+                group_key=F("trade_type"), group_label=Value("")
+            ).annotate(total_value=total),
+        }
 
-        context["countries"] = (
-            TradeData.objects.values_list("country", flat=True)
-            .distinct()
-            .order_by("country")
-        )
+        parts, params = [], []
+        for index, (name, panel) in enumerate(panels.items()):
+            sql, panel_params = panel.query.sql_with_params()
+            parts.append(
+                f"SELECT '{name}' AS panel, group_key, group_label, total_value "
+                f"FROM ({sql}) AS panel_{index}"
+            )
+            params.extend(panel_params)
 
-        return context
+        results = {name: [] for name in panels}
+        with connection.cursor() as cursor:
+            cursor.execute(
+                " UNION ALL ".join(parts) + " ORDER BY panel, total_value DESC",
+                params,
+            )
+            for name, key, label, value in cursor.fetchall():
+                # Raw rows skip the ORM's converters; SQLite returns floats
+                value = Decimal(str(value)) if value is not None else Decimal(0)
+                results[name].append((key, label, value))
+
+        return results
 
 
 # export data
+class Echo:
+    """File-like object that hands each written CSV line back to the caller."""
+
+    def write(self, value):
+        return value
+
+
 @login_required(login_url="login")
 def export_filtered_data(request):
-    queryset = TradeData.objects.all()
+    queryset = TradeData.objects.select_related("hs_code").only(*TRADE_ROW_FIELDS)
 
     # Apply same filters
     year = request.GET.get("year")
@@ -316,39 +548,41 @@ def export_filtered_data(request):
     if country:
         queryset = queryset.filter(country=country)
 
-    # Create response
-    response = HttpResponse(content_type="text/csv")
-    response["Content-Disposition"] = 'attachment; filename="filtered_trade_data.csv"'
+    writer = csv.writer(Echo())
 
-    writer = csv.writer(response)
-
-    # Header
-    writer.writerow(
-        [
-            "Year",
-            "Month",
-            "Country",
-            "HS Code",
-            "Description",
-            "Trade Type",
-            "Quantity",
-            "Value (USD)",
-        ]
-    )
-
-    # Data rows
-    for obj in queryset:
-        writer.writerow(
+    def rows():
+        # Header
+        yield writer.writerow(
             [
-                obj.year,
-                obj.month,
-                obj.country,
-                obj.hs_code.code if obj.hs_code else "",
-                obj.hs_code.description if obj.hs_code else "",
-                obj.trade_type,
-                obj.quantity,
-                obj.value_usd,
+                "Year",
+                "Month",
+                "Country",
+                "HS Code",
+                "Description",
+                "Trade Type",
+                "Quantity",
+                "Value (USD)",
             ]
         )
 
+        # Data rows; iterator() skips the result cache and, on PostgreSQL,
+        # streams through a server-side cursor (WITH HOLD under autocommit)
+        for obj in queryset.iterator(chunk_size=5000):
+            yield writer.writerow(
+                [
+                    obj.year,
+                    obj.month,
+                    obj.country,
+                    obj.hs_code.code if obj.hs_code else "",
+                    obj.hs_code.description if obj.hs_code else "",
+                    obj.trade_type,
+                    obj.quantity,
+                    obj.value_usd,
+                ]
+            )
+
+    # Stream the CSV instead of building it in memory
+    response = StreamingHttpResponse(rows(), content_type="text/csv")
+    response["Content-Disposition"] = 'attachment; filename="filtered_trade_data.csv"'
+
     return response